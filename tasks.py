@@ -7,16 +7,14 @@ of the commands to use."""
 # pylint: disable=redefined-builtin,redefined-outer-name
 
 import os
+import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
-from invoke import task
+from invoke import Context, task
 from invoke.exceptions import Exit
 
-from rich import box, print
-from rich.align import Align
-from rich.console import Console
-from rich.table import Table
-
 ROOT_DIR = os.path.dirname(__file__)
 ROOT_PATH = Path(ROOT_DIR)
 
@@ -24,7 +22,10 @@ APP_NAME = "verthandi"
 APP_PATH = ROOT_PATH / APP_NAME
 APP_DIR = APP_PATH.as_posix()
 
-con = Console()
+COVERAGE_CONFIG = (ROOT_PATH / "pyproject.toml").as_posix()
+
+# Checks that must wait for another check to finish before starting
+CHECK_DEPENDENCIES = {"coverage": "test"}
 
 
 def _code_to_stat(exit_code: int, underline=False, emoji=True) -> str:
@@ -40,6 +41,41 @@ def _code_to_stat(exit_code: int, underline=False, emoji=True) -> str:
     return r
 
 
+def _run(c, command, **kwargs):
+    """Runs a command, using a pty unless the output is being captured."""
+    kwargs.setdefault("pty", not c.config.run.hide)
+    kwargs.setdefault("warn", True)
+
+    return c.run(command, **kwargs)
+
+
+def _print_header(title):
+    print("-" * 20)
+    print(title)
+    print("-" * 20)
+
+
+def _run_check(c, fn, kwargs, prerequisite=None):
+    if prerequisite is not None:
+        prerequisite.result()
+
+    return fn(c, **kwargs)
+
+
+def _purge_pycache(root):
+    """Removes __pycache__ directories and .pyc/.pyo files below root."""
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name == "__pycache__":
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                else:
+                    _purge_pycache(entry.path)
+
+            elif entry.name.endswith((".pyc", ".pyo")):
+                Path(entry.path).unlink(missing_ok=True)
+
+
 @task
 def list(c):
     """Lists the available tasks."""
@@ -55,162 +91,262 @@ def help(c, task):
 @task(
     help={
         "coverage": "Whether to run the code coverage analysis.",
+        "parallel": "Whether to distribute the tests across all CPUs.",
+        "term_missing": "Whether to print the lines missing coverage.",
     }
 )
-def test(c, coverage=True, verbose=True):
+def test(c, coverage=True, verbose=True, parallel=True, term_missing=True):
     """Runs the test suite."""
     args = []
 
     if coverage:
         args.append(f"--cov={APP_NAME}")
-        args.append("--cov-report=term-missing")
+        args.append(f"--cov-config={COVERAGE_CONFIG}")
+        args.append("--cov-context=test")
+        args.append(f"--cov-report={'term-missing' if term_missing else ''}")
 
     if verbose:
         args.append("-v")
 
+    if parallel:
+        args.append("-n auto")
+
     with c.cd(APP_DIR):
-        return c.run(f"pytest {' '.join(args)} .", pty=True, warn=True)
+        return _run(c, f"pytest {' '.join(args)} .")
 
 
 @task
 def coverage(c):
     """Reports the coverage from the last test run."""
     with c.cd(APP_DIR):
-        return c.run("coverage report --fail-under=100", pty=True, warn=True)
+        # Fails harmlessly if pytest-cov already combined the data files
+        _run(c, f"coverage combine --rcfile={COVERAGE_CONFIG}", hide=True)
 
+        return _run(
+            c,
+            f"coverage report --rcfile={COVERAGE_CONFIG} --show-missing "
+            + "--fail-under=100",
+        )
 
-@task
-def lint(c):
+
+@task(help={"fix": "Whether to automatically fix the issues found."})
+def ruff(c, fix=False):
+    """Runs ruff on the code."""
+    args = []
+
+    if fix:
+        args.append("--fix")
+
+    with c.cd(ROOT_DIR):
+        return _run(c, f"ruff check {' '.join(args)} {APP_NAME}")
+
+
+@task(
+    help={
+        "jobs": "Number of pylint processes to use. 0 uses all CPUs.",
+        "cache": "Whether to save pylint's run statistics for comparing scores.",
+    }
+)
+def lint(c, jobs=0, cache=True):
     """Runs pylint on the code."""
+    args = [f"--jobs={jobs}"]
+
+    if not cache:
+        args.append("--persistent=n")
+
     with c.cd(ROOT_DIR):
-        return c.run(f"pylint {APP_DIR}", pty=True, warn=True)
+        return _run(c, f"pylint {' '.join(args)} {APP_NAME}")
 
 
-@task
-def fixmes(c):
+@task(help={"jobs": "Number of pylint processes to use. 0 uses all CPUs."})
+def fixmes(c, jobs=0):
     """Lists the fixmes and TODOs of the project."""
-    with c.cd(APP_PATH.as_posix()):
-        return c.run(
-            f"pylint {FOLDERS} --disable=all --enable=fixme",
-            pty=True,
-            warn=True,
-        )
+    with c.cd(ROOT_DIR):
+        return _run(c, f"pylint --jobs={jobs} {APP_NAME} --disable=all --enable=fixme")
 
 
-@task
-def mypy(c):
+@task(
+    help={
+        "cache": "Whether to reuse the results of previous runs.",
+        "daemon": "Whether to use the weaker mypy daemon check. See the dmypy task.",
+    }
+)
+def mypy(c, cache=True, daemon=False):
     """Runs mypy type checking on the code."""
-    with c.cd(ROOT_DIR):
-        return c.run(f"mypy --config-file .mypy.ini {APP_DIR}", pty=True, warn=True)
+    if daemon and cache:
+        result = dmypy(c)
 
+        # dmypy uses the same exit code for its own failures as for type errors,
+        # so any failure is confirmed with a plain (incremental) mypy run.
+        # A pass is not confirmed, so this is weaker than plain mypy.
+        if result.exited == 0:
+            return result
 
-@task(help={"check": "Whether to just check the code or format it."})
-def black(c, check=False, diff=False):
-    """
-    Applies black formatter to the code.
-    """
-    args = []
-
-    if check:
-        args.append("--check")
+    args = ["--config-file .mypy.ini"]
 
-    if diff:
-        args.append("--diff")
+    if not cache:
+        args.append("--no-incremental")
 
-    with c.cd(APP_PATH.as_posix()):
-        return c.run(f"black {' '.join(args)} .", pty=True, warn=True)
+    with c.cd(ROOT_DIR):
+        return _run(c, f"mypy {' '.join(args)} {APP_DIR}")
 
 
-@task(help={"check": "Whether to just check the code or format it."})
-def isort(c, check=False, diff=False):
-    """
-    Applies black formatter to the code.
+@task
+def dmypy(c):
     """
-    args = []
+    Runs a faster but weaker mypy check on the code using the mypy daemon.
 
-    if check:
-        args.append("--check-only")
+    dmypy does not support the follow_imports = silent set in .mypy.ini, so
+    imports are skipped instead. Third-party modules such as pydantic, httpx
+    and typer are then treated as Any and the pydantic plugin has no effect,
+    so this can pass code that the mypy task rejects.
 
-    if diff:
-        args.append("--diff")
+    The daemon is left running so later runs are incremental.
+    Stop it with `dmypy stop`.
+    """
+    args = ["--config-file .mypy.ini", "--follow-imports=skip"]
 
-    with c.cd(APP_DIR):
-        return c.run(f"isort {' '.join(args)} {APP_DIR}", pty=True, warn=True)
+    with c.cd(ROOT_DIR):
+        return _run(c, f"dmypy run -- {' '.join(args)} {APP_DIR}")
 
 
 @task(help={"check": "Whether to just check the code or format it."})
 def format(c, check=False, diff=False):
-    """Formats the code."""
+    """Formats the code and sorts the imports using ruff."""
+    format_args = []
+    isort_args = ["--select I"]
 
-    black_ = black(c, check=check, diff=diff).exited
-    isort_ = isort(c, check=check, diff=diff).exited
+    if check:
+        format_args.append("--check")
+    else:
+        isort_args.append("--fix")
 
-    return black_ + isort_
+    if diff:
+        format_args.append("--diff")
+        isort_args.append("--diff")
 
+    # Both commands always run, failing if either of them failed
+    with c.cd(ROOT_DIR):
+        return _run(
+            c,
+            f"ruff format {' '.join(format_args)} {APP_NAME}; format_exit=$?; "
+            + f"ruff check {' '.join(isort_args)} {APP_NAME} && exit $format_exit",
+        )
 
-@task
+
+@task(
+    help={
+        "parallel": "Whether to run the checkers concurrently.",
+        "cache": "Whether to use mypy's cache and save pylint's run statistics.",
+        "daemon": "Whether to use the weaker mypy daemon check. See the dmypy task.",
+    }
+)
 def check(
     c,
-    lint_=True,
+    ruff_=True,
+    lint_=False,
     fixmes_=False,
     test_=True,
     coverage_=True,
     mypy_=True,
-    black_=True,
-    isort_=True,
+    format_=True,
     docs_=True,
     clean_=True,
+    parallel=True,
+    cache=True,
+    daemon=False,
 ):
     """Runs all checkers on the code."""
-    results = {}
+    # Rich is only needed for the report, so keep it out of every other task
+    from rich import box, print as rprint  # pylint: disable=import-outside-toplevel
+    from rich.align import Align  # pylint: disable=import-outside-toplevel
+    from rich.console import Console  # pylint: disable=import-outside-toplevel
+    from rich.table import Table  # pylint: disable=import-outside-toplevel
+
+    con = Console()
+
+    checks = {}
+
+    if ruff_:
+        checks["ruff"] = ("Running ruff...", ruff, {})
 
     if lint_:
-        print("-" * 20)
-        print("Running pylint...")
-        print("-" * 20)
-        results["lint"] = lint(c).exited
+        checks["lint"] = ("Running pylint...", lint, {"cache": cache})
 
     if fixmes_:
-        print("-" * 20)
-        print("Running pylint (fixmes)...")
-        print("-" * 20)
-        results["FIXME's"] = fixmes(c).exited
+        checks["FIXME's"] = ("Running pylint (fixmes)...", fixmes, {})
 
     if test_:
-        print("-" * 20)
-        print("Running tests...")
-        print("-" * 20)
-        results["test"] = test(c, verbose=False).exited
+        checks["test"] = (
+            "Running tests...",
+            test,
+            {"verbose": False, "term_missing": False},
+        )
 
     if coverage_:
-        print("-" * 20)
-        print("Reporting test coverage...")
-        print("-" * 20)
-        results["coverage"] = coverage(c).exited
+        checks["coverage"] = ("Reporting test coverage...", coverage, {})
 
     if mypy_:
-        print("-" * 20)
-        print("Running mypy...")
-        print("-" * 20)
-        results["mypy"] = mypy(c).exited
-
-    if black_:
-        print("-" * 20)
-        print("Running black (formatting, just checking)...")
-        print("-" * 20)
-        results["black"] = black(c, check=True).exited
-
-    if isort_:
-        print("-" * 20)
-        print("Running isort (formatting, just checking)...")
-        print("-" * 20)
-        results["isort"] = isort(c, check=True).exited
+        checks["mypy"] = ("Running mypy...", mypy, {"cache": cache, "daemon": daemon})
+
+    if format_:
+        checks["format"] = (
+            "Running ruff (formatting, just checking)...",
+            format,
+            {"check": True},
+        )
 
     if docs_:
-        print("-" * 20)
-        print("Running mkdocs...")
-        print("-" * 20)
-        results["docs"] = docs(c, build=True, verbose=False).exited
+        checks["docs"] = ("Running mkdocs...", docs, {"build": True, "verbose": False})
+
+    if parallel:
+        # Capture the output of each checker so it can be printed in one piece
+        buffered = c.config.clone()
+        buffered.run.hide = "both"
+
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            futures = {}
+
+            for name, (_, fn, kwargs) in checks.items():
+                futures[name] = executor.submit(
+                    _run_check,
+                    Context(config=buffered),
+                    fn,
+                    kwargs,
+                    futures.get(CHECK_DEPENDENCIES.get(name)),
+                )
+
+            names = {future: name for name, future in futures.items()}
+            results = {}
+
+            for future in as_completed(names):
+                name = names[future]
+                _print_header(checks[name][0])
+
+                try:
+                    result = future.result()
+                except Exception as e:  # pylint: disable=broad-except
+                    # Report the check as failed rather than aborting the report
+                    print(f"{name} failed with {e!r}")
+                    results[name] = 1
+                    continue
+
+                # Write the captured output as is, so diagnostics are not rewrapped
+                sys.stdout.write(result.stdout)
+                sys.stdout.flush()
+                sys.stderr.write(result.stderr)
+                sys.stderr.flush()
+
+                results[name] = result.exited
+
+        results = {name: results[name] for name in checks}
+
+    else:
+        results = {}
+
+        for name, (title, fn, kwargs) in checks.items():
+            _print_header(title)
+            results[name] = fn(c, **kwargs).exited
 
     result = 1 if any(results.values()) else 0
 
@@ -230,7 +366,7 @@ def check(
     for k, v in results.items():
         t.add_row(k, _code_to_stat(v))
 
-    print("\n")
+    rprint("\n")
     con.print(Align(t, "center"))
 
     if result == 0:
@@ -245,8 +381,8 @@ def check(
             + "Don't commit just yet! :x:"
         )
 
-    print(Align(f"[underline bold]{exit_msg}[/underline bold]", "center"))
-    print("\n")
+    rprint(Align(f"[underline bold]{exit_msg}[/underline bold]", "center"))
+    rprint("\n")
 
     if clean_:
         clean(c, silent=True)
@@ -267,7 +403,7 @@ def setuppy(c):
             c.run("dephell deps convert --from=pyproject.toml --to=setup.py", pty=True)
 
             c.run('echo -e "# pylint: disable=all\n$(cat setup.py)" > setup.py')
-            c.run("black setup.py")
+            c.run("ruff format setup.py")
 
 
 @task
@@ -289,7 +425,8 @@ def clean(
         if coverage:
             if not silent:
                 print("Cleaning up after coverage...")
-            c.run("rm .coverage* || true", hide=True)
+            for path in APP_PATH.glob(".coverage*"):
+                path.unlink(missing_ok=True)
 
         if setuppy:
             if not silent:
@@ -307,10 +444,7 @@ def clean(
         if pyc:
             if not silent:
                 print("Cleaning up .pyc and __pycache__...")
-            c.run(
-                r'find . | grep -E "(__pycache__|\.pyc|\.pyo$)" | xargs rm -rf || true',
-                hide=True,
-            )
+            _purge_pycache(APP_DIR)
 
         if docs_:
             if not silent:
@@ -327,6 +461,6 @@ def docs(c, port=8002, build=False, verbose=False):
 
     with c.cd(APP_DIR):
         if build:
-            return c.run(f"mkdocs build {' '.join(args)}", pty=True, warn=True)
+            return _run(c, f"mkdocs build {' '.join(args)}")
         else:
             return c.run(f"mkdocs serve -a 0.0.0.0:{port} {' '.join(args)}", pty=True)
@@ -3,32 +3,58 @@ The main CLI entry point.
 """
 
 import datetime as dt
+from functools import lru_cache
+from typing import Optional
 
 import typer
-from dateutil.parser import parse as dt_parse
 from rich.console import Console
 from rich.table import Table
 
 from verthandi.clockify.client import ClockifyClient
-from verthandi.config import settings
+from verthandi.config import get_settings
 
 app = typer.Typer()
 console = Console()
-client = ClockifyClient(api_key=settings.API_KEY, base_url=settings.BASE_URL)
 
 
-def get_timedelta(dts_1: str) -> str:
+@lru_cache(maxsize=1)
+def get_client() -> ClockifyClient:
+    """
+    Returns the Clockify client, creating it on first use.
+
+    Returns:
+        ClockifyClient: Client configured from the User Settings.
+    """
+    settings = get_settings()
+
+    return ClockifyClient(api_key=settings.API_KEY, base_url=settings.BASE_URL)
+
+
+def _parse_iso(dts: str) -> dt.datetime:
+    # datetime.fromisoformat only accepts the Z suffix from Python 3.11
+    if dts.endswith("Z"):
+        dts = dts[:-1] + "+00:00"
+
+    return dt.datetime.fromisoformat(dts)
+
+
+def get_timedelta(dts_1: str, now: Optional[dt.datetime] = None) -> str:
     """
     Returns the timedelta in a hh:mm:ss format.
 
     Args:
-        dts_1 (str): ISO-like datetime string.
+        dts_1 (str): ISO 8601 datetime string.
+        now (Optional[dt.datetime]): The datetime to compare against.
+            If None the current time will be used.
+            Defaults to None.
 
     Returns:
         str: The timedelta between dts_1 and now.
     """
-    now = dt.datetime.now(dt.timezone.utc).replace(microsecond=0)
-    dt_1 = dt_parse(dts_1)
+    if now is None:
+        now = dt.datetime.now(dt.timezone.utc).replace(microsecond=0)
+
+    dt_1 = _parse_iso(dts_1)
 
     timedelta = now - dt_1
 
@@ -37,18 +63,20 @@ def get_timedelta(dts_1: str) -> str:
 
 @app.command(name="list")
 def list_() -> None:
-    time_entries = client.list_timeentry(params={"in-progress": True})
+    time_entries = get_client().list_timeentry(params={"in-progress": True})
 
     t = Table(show_header=True)
     t.add_column("Description")
     t.add_column("Start :clock1:")
     t.add_column("\N{GREEK CAPITAL LETTER DELTA}t")
 
+    now = dt.datetime.now(dt.timezone.utc).replace(microsecond=0)
+
     for entry in time_entries:
         t.add_row(
             entry["description"],
             entry["timeInterval"]["start"],
-            get_timedelta(entry["timeInterval"]["start"]),
+            get_timedelta(entry["timeInterval"]["start"], now),
         )
 
     console.print(t)
@@ -60,7 +88,7 @@ def start(description: str) -> None:
         "description": description,
         "start": dt.datetime.now(dt.timezone.utc),
     }
-    client.start_timeentry(body=body)
+    get_client().start_timeentry(body=body)
 
 
 @app.command()
@@ -69,7 +97,7 @@ def finish() -> None:
         "end": dt.datetime.now(dt.timezone.utc),
     }
 
-    print(client.stop_timeentry(body=body))
+    print(get_client().stop_timeentry(body=body))
 
 
 @app.command()
@@ -77,7 +105,7 @@ def config() -> None:
     """
     Prints the configuration.
     """
-    typer.echo(settings.to_str())
+    typer.echo(get_settings().to_str())
 
 
 if __name__ == "__main__":
@@ -1,14 +1,15 @@
 """
 Contains the Clockify REST Client
 """
-from typing import Any, Dict, List, Literal, Optional, Union
-from urllib.parse import urlparse, urlunparse
+import atexit
+from functools import cached_property
+from typing import Any, Dict, List, Optional, Union
 
 import orjson as json
 
-import requests
+import httpx
 
-from verthandi.config import settings
+from verthandi.config import get_settings
 
 from .typing import Defaults
 
@@ -23,56 +24,66 @@ class ClockifyClient:
 
     def __init__(self, api_key: Union[str, None], base_url: Optional[str] = None):
         if base_url is None:
-            base_url = settings.BASE_URL
+            base_url = get_settings().BASE_URL
 
-        self._session = requests.Session()
-        self._session.headers.update(
-            {
+        self._session = httpx.Client(
+            http2=True,
+            headers={
                 "X-Api-Key": api_key or "",
+                "Accept": "application/json",
                 "Content-Type": "application/json",
-            }
+            },
+            timeout=httpx.Timeout(10.0),
+            limits=httpx.Limits(max_keepalive_connections=20),
         )
+        atexit.register(self._session.close)
 
         self._base_url: str = base_url
 
-        # Setup default workspace and user
+    @cached_property
+    def _defaults(self) -> Defaults:
+        """
+        Returns the default workspace and user, fetching them on first use.
+
+        Returns:
+            Defaults: Default workspace and user ids.
+        """
         user_data = self.get_user()
-        self._defaults: Defaults = {
+
+        return {
             "workspaceId": user_data["defaultWorkspace"],
             "userId": user_data["id"],
         }
 
-    @property
-    def _reports_base_url(self) -> str:
+    def _url_workspace(self, endpoint: str, workspace_id: Optional[str] = None) -> str:
         """
-        Returns the reports base url
+        Returns the url for an endpoint under a workspace
+
+        Args:
+            endpoint (str): Endpoint without leading slash.
+            workspace_id (Optional[str]): workspace_id to use.
+                If None the default workspace will be used.
+                Defaults to None.
 
         Returns:
-            str: reports base url
+            str: url
         """
+        if workspace_id is None:
+            workspace_id = self._defaults["workspaceId"]
 
-        url_tuple = urlparse(self._base_url)
-        url_tuple = url_tuple._replace(
-            netloc=url_tuple.netloc.replace("api", "reports", 1)
-        )
-
-        return urlunparse(url_tuple)
+        return f"{self._base_url}/workspaces/{workspace_id}/{endpoint}"
 
-    def _get_url(
+    def _url_workspace_user(
         self,
         endpoint: str,
-        url_type: Optional[Literal["report", "workspace", "workspace_user"]] = None,
         workspace_id: Optional[str] = None,
         user_id: Optional[str] = None,
     ) -> str:
         """
-        Returns the appropriate url for a given endpoint
+        Returns the url for an endpoint under a user in a workspace
 
         Args:
             endpoint (str): Endpoint without leading slash.
-            url_type (Optional[Literal['report', 'workspace', 'workspace_user')]]:
-                Whether to do special handling of url.
-                Defaults to None
             workspace_id (Optional[str]): workspace_id to use.
                 If None the default workspace will be used.
                 Defaults to None.
@@ -83,28 +94,13 @@ class ClockifyClient:
         Returns:
             str: url
         """
+        if workspace_id is None:
+            workspace_id = self._defaults["workspaceId"]
 
-        if url_type == "report":
-            return self._reports_base_url + "/" + endpoint
-
-        if url_type == "workspace":
-            if workspace_id is None:
-                workspace_id = self._defaults["workspaceId"]
-
-            return f"{self._base_url}/workspaces/{workspace_id}/{endpoint}"
-
-        if url_type == "workspace_user":
-            if workspace_id is None:
-                workspace_id = self._defaults["workspaceId"]
+        if user_id is None:
+            user_id = self._defaults["userId"]
 
-            if user_id is None:
-                user_id = self._defaults["userId"]
-
-            return (
-                f"{self._base_url}/workspaces/{workspace_id}/user/{user_id}/{endpoint}"
-            )
-
-        return self._base_url + "/" + endpoint
+        return f"{self._base_url}/workspaces/{workspace_id}/user/{user_id}/{endpoint}"
 
     def get_user(self) -> Dict[str, Any]:
         """
@@ -113,11 +109,11 @@ class ClockifyClient:
         Returns:
             dict: Dict of user information
         """
-        url = self._get_url("user")
+        url = f"{self._base_url}/user"
 
         req = self._session.get(url)
 
-        return json.loads(req.text)
+        return json.loads(req.content)
 
     def list_timeentry(
         self,
@@ -125,15 +121,10 @@ class ClockifyClient:
         user_id: Optional[str] = None,
         params: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, Any]]:
-        url = self._get_url(
-            "time-entries",
-            url_type="workspace_user",
-            workspace_id=workspace_id,
-            user_id=user_id,
-        )
+        url = self._url_workspace_user("time-entries", workspace_id, user_id)
         req = self._session.get(url, params=params)
 
-        return json.loads(req.text)
+        return json.loads(req.content)
 
     def start_timeentry(
         self,
@@ -141,15 +132,13 @@ class ClockifyClient:
         body: Optional[Dict[str, Any]] = None,
         params: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
-        url = self._get_url(
-            "time-entries", url_type="workspace", workspace_id=workspace_id
-        )
+        url = self._url_workspace("time-entries", workspace_id)
 
         req = self._session.post(
-            url, params=params, data=json.dumps(body, option=json.OPT_UTC_Z)
+            url, params=params, content=json.dumps(body, option=json.OPT_UTC_Z)
         )
 
-        return json.loads(req.text)
+        return json.loads(req.content)
 
     def stop_timeentry(
         self,
@@ -158,15 +147,10 @@ class ClockifyClient:
         body: Optional[Dict[str, Any]] = None,
         params: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
-        url = self._get_url(
-            "time-entries",
-            url_type="workspace_user",
-            workspace_id=workspace_id,
-            user_id=user_id,
-        )
+        url = self._url_workspace_user("time-entries", workspace_id, user_id)
 
         req = self._session.patch(
-            url, params=params, data=json.dumps(body, option=json.OPT_UTC_Z)
+            url, params=params, content=json.dumps(body, option=json.OPT_UTC_Z)
         )
 
-        return json.loads(req.text)
+        return json.loads(req.content)
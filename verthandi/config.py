@@ -6,18 +6,26 @@ from __future__ import annotations
 
 import logging
 import os
+import sys
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Union
 
 import appdirs
-import tomlkit
+import tomli_w
 from pydantic import BaseSettings
 
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
+
 logger = logging.getLogger(__name__)
 
 _ConfigFileT = Optional[Union[str, Path]]
 
 
+@lru_cache(maxsize=1)
 def _get_appdirs_path() -> Path:
     path = Path(appdirs.user_config_dir("Verthandi", False)) / "verthandi.toml"
 
@@ -39,7 +47,8 @@ class VerthandiSettings(BaseSettings):
         Returns:
             str: Settings as TOML string.
         """
-        return tomlkit.dumps(self.dict())
+        # TOML has no null value, so unset settings are left out
+        return tomli_w.dumps(self.dict(exclude_none=True))
 
     @classmethod
     def load(cls, filepath: _ConfigFileT = None) -> VerthandiSettings:
@@ -57,8 +66,8 @@ class VerthandiSettings(BaseSettings):
         logger.info("Loading User Settings from %s", filepath)
 
         try:
-            with open(filepath, "r") as f:
-                data = tomlkit.parse(f.read())
+            with open(filepath, "rb") as f:
+                data = tomllib.load(f)
 
             return cls.parse_obj(data)
 
@@ -95,4 +104,12 @@ class VerthandiSettings(BaseSettings):
             f.write(self.to_str())
 
 
-settings = VerthandiSettings.load()
+@lru_cache(maxsize=1)
+def get_settings() -> VerthandiSettings:
+    """
+    Returns the User Settings, loading them on first use.
+
+    Returns:
+        VerthandiSettings: The User Settings.
+    """
+    return VerthandiSettings.load()
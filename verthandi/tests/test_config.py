@@ -0,0 +1,33 @@
+"""
+Tests for the configuration of Verthandi.
+"""
+
+from verthandi.config import VerthandiSettings
+
+
+def test_to_str_after_assignment() -> None:
+    """to_str reflects settings assigned after an earlier call."""
+    settings = VerthandiSettings(API_KEY="abc")
+    assert 'API_KEY = "abc"' in settings.to_str()
+
+    settings.API_KEY = "zzz"  # pylint: disable=invalid-name
+
+    assert 'API_KEY = "zzz"' in settings.to_str()
+
+
+def test_to_str_after_copy() -> None:
+    """to_str reflects settings updated through copy."""
+    settings = VerthandiSettings(API_KEY="abc")
+    assert 'API_KEY = "abc"' in settings.to_str()
+
+    copied = settings.copy(update={"API_KEY": "zzz"})
+
+    assert 'API_KEY = "zzz"' in copied.to_str()
+    assert 'API_KEY = "abc"' in settings.to_str()
+
+
+def test_to_str_leaves_out_unset_settings() -> None:
+    """to_str leaves out settings that are None, as TOML has no null."""
+    settings = VerthandiSettings(API_KEY=None)
+
+    assert "API_KEY" not in settings.to_str()